@@ -0,0 +1,32 @@
+"""add updated_at to events table
+
+Revision ID: 3c1f7a9e2b54
+Revises: ea8162ef799f
+Create Date: 2026-10-19 10:12:41.208734
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3c1f7a9e2b54'
+down_revision: Union[str, Sequence[str], None] = 'ea8162ef799f'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('events', sa.Column('updated_at', sa.DateTime(), nullable=True))
+    op.create_index(op.f('ix_events_updated_at'), 'events', ['updated_at'], unique=False)
+    # existing rows have never been stamped, treat them as modified now
+    op.execute(sa.text("UPDATE events SET updated_at = CURRENT_TIMESTAMP WHERE updated_at IS NULL"))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_events_updated_at'), table_name='events')
+    op.drop_column('events', 'updated_at')
@@ -1,14 +1,67 @@
 from pydantic_settings import BaseSettings, SettingsConfigDict
-from fastapi.templating import Jinja2Templates
+from typing import List, Optional
 import os
 
+from templating import StreamingJinja2Templates
+
 class Settings(BaseSettings):
     SECRET_KEY: str
     DATABASE_URL: str
+    # Read replicas for public pages, as a JSON list of database URLs
+    DATABASE_REPLICA_URLS: List[str] = []
+    # After a write, the user reads from the primary for this many seconds
+    REPLICA_STICKY_SECONDS: int = 10
+    REPLICA_HEALTH_INTERVAL: int = 10
     DEBUG: bool = False
     UPLOAD_DIR: str = "static/uploads"
+    MAX_UPLOAD_SIZE: int = 10 * 1024 * 1024
+    # Seconds a direct upload may wait for its event form before it is deleted
+    UPLOAD_CLAIM_TIMEOUT: int = 86400
+
+    # Uploads storage: "local" (UPLOAD_DIR, served from /static) or "s3"
+    STORAGE_BACKEND: str = "local"
+    S3_BUCKET: str = ""
+    S3_ENDPOINT_URL: Optional[str] = None  # e.g. http://localhost:9000 for MinIO
+    S3_REGION: Optional[str] = None
+    S3_ACCESS_KEY_ID: Optional[str] = None
+    S3_SECRET_ACCESS_KEY: Optional[str] = None
+    # Public bucket/CDN base URL; without it images are served via presigned URLs
+    S3_PUBLIC_URL: Optional[str] = None
+    S3_PRESIGN_EXPIRY: int = 3600
     SESSION_AGE: int = 3600
 
+    # Templates: compiled bytecode is persisted here and shared across workers
+    TEMPLATE_CACHE_DIR: str = ".jinja_cache"
+    TEMPLATE_STREAMING: bool = False
+
+    # iCalendar feeds: how long clients may reuse a feed before revalidating
+    ICS_CACHE_MAX_AGE: int = 300
+
+    # Background jobs: run a worker inside the app process, or use worker.py
+    JOB_WORKER_ENABLED: bool = True
+    JOB_CONCURRENCY: int = 4
+    JOB_POLL_INTERVAL: float = 1.0
+    JOB_RETRY_BACKOFF: float = 2.0
+    JOB_LOCK_TIMEOUT: int = 300
+    JOB_RETENTION_DAYS: int = 7
+    JOB_SWEEP_INTERVAL: float = 300
+
+    # Rate limiting: "<requests>/<second|minute|hour>" per client and route.
+    # The memory backend limits each worker process, redis is shared by all.
+    RATE_LIMIT_ENABLED: bool = True
+    RATE_LIMIT_BACKEND: str = "memory"
+    RATE_LIMIT_REDIS_URL: str = "redis://localhost:6379/0"
+    RATE_LIMIT_TRUSTED_PROXIES: int = 0
+    RATE_LIMIT_LOGIN: str = "10/minute"
+    RATE_LIMIT_REGISTER: str = "5/minute"
+    RATE_LIMIT_UPLOAD: str = "20/minute"
+    RATE_LIMIT_DEEP_PAGES: str = "30/minute"
+    RATE_LIMIT_DEEP_PAGE_FROM: int = 10
+
+    # Requests allowed in flight at once on bcrypt and upload routes
+    MAX_CONCURRENT_HASHING: int = 8
+    MAX_CONCURRENT_UPLOADS: int = 4
+
     # tell Pydantic to read from the .env file
     model_config = SettingsConfigDict(env_file=".env")
 
@@ -19,4 +72,9 @@ settings = Settings()
 os.makedirs(settings.UPLOAD_DIR, exist_ok=True)
 
 # Shared templates instance
-templates = Jinja2Templates(directory="templates")
+templates = StreamingJinja2Templates(
+    directory="templates",
+    cache_dir=settings.TEMPLATE_CACHE_DIR,
+    auto_reload=settings.DEBUG,
+    streaming=settings.TEMPLATE_STREAMING,
+)
@@ -1,11 +1,116 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, declarative_base
+import itertools
+import threading
+import time
+from typing import List, Optional
+
+from fastapi import Request
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session, sessionmaker, declarative_base
+from sqlalchemy.sql.expression import Delete, Insert, Update
 from config import settings
 
 
-engine = create_engine(settings.DATABASE_URL, connect_args={"check_same_thread": False})
+def make_engine(url: str, **kwargs) -> Engine:
+    # check_same_thread is a SQLite-only option
+    connect_args = {"check_same_thread": False} if url.startswith("sqlite") else {}
+    return create_engine(url, connect_args=connect_args, **kwargs)
+
+
+engine = make_engine(settings.DATABASE_URL)
+
+
+class ReplicaPool:
+    """
+    Round-robins reads over the replica engines that are currently healthy.
+
+    Health is probed with ``SELECT 1`` by a background thread every
+    ``check_interval`` seconds (see ``start``), never on the request path.
+    A replica whose connection fails during a request is taken out of
+    rotation until the next probe succeeds.
+    """
+
+    def __init__(self, engines: List[Engine], check_interval: int = 10):
+        self.engines = engines
+        self.check_interval = check_interval
+        self._healthy = {id(e): True for e in engines}
+        self._cycle = itertools.cycle(engines)
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        for replica in engines:
+            event.listen(replica, "handle_error", self._on_error)
+
+    def _on_error(self, context):
+        if context.is_disconnect or context.connection is None:
+            self.mark_down(context.engine)
+
+    def mark_down(self, replica: Engine):
+        with self._lock:
+            self._healthy[id(replica)] = False
+
+    def is_healthy(self, replica: Engine) -> bool:
+        with self._lock:
+            return self._healthy[id(replica)]
+
+    def check_all(self):
+        """Probes every replica and records the result."""
+        for replica in self.engines:
+            try:
+                with replica.connect() as conn:
+                    conn.execute(text("SELECT 1"))
+                healthy = True
+            except Exception:
+                healthy = False
+            with self._lock:
+                self._healthy[id(replica)] = healthy
+
+    def start(self):
+        """Probes the replicas once, then keeps probing them in a background thread."""
+        if not self.engines or (self._thread and self._thread.is_alive()):
+            return
+        self.check_all()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="replica-health", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        while not self._stop.wait(self.check_interval):
+            self.check_all()
+
+    def choose(self) -> Optional[Engine]:
+        """Returns the next healthy replica, or None to fall back to the primary."""
+        for _ in range(len(self.engines)):
+            with self._lock:
+                replica = next(self._cycle)
+                if self._healthy[id(replica)]:
+                    return replica
+        return None
 
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+replicas = ReplicaPool(
+    [make_engine(url, pool_pre_ping=True) for url in settings.DATABASE_REPLICA_URLS],
+    check_interval=settings.REPLICA_HEALTH_INTERVAL,
+)
+
+
+class RoutingSession(Session):
+    """
+    Session that sends reads to the replica stored in ``info["replica"]``
+    (when there is one) and everything else to the primary engine.
+    """
+
+    def get_bind(self, mapper=None, clause=None, **kw):
+        replica = self.info.get("replica")
+        if replica is None or self._flushing or isinstance(clause, (Insert, Update, Delete)):
+            return super().get_bind(mapper=mapper, clause=clause, **kw)
+        return replica
+
+
+SessionLocal = sessionmaker(class_=RoutingSession, autocommit=False, autoflush=False, bind=engine)
 
 Base = declarative_base()
 
@@ -17,3 +122,23 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+def mark_recent_write(request: Request):
+    """Pins the client's reads to the primary for REPLICA_STICKY_SECONDS."""
+    request.session["last_write"] = time.time()
+
+
+def get_read_db(request: Request):
+    """
+    Dependency for read-only routes: reads go to a healthy replica, unless
+    the client wrote recently (read-your-writes) or no replica is available.
+    """
+    last_write = request.session.get("last_write", 0)
+    sticky = time.time() - last_write < settings.REPLICA_STICKY_SECONDS
+    replica = None if sticky or not replicas.engines else replicas.choose()
+    db = SessionLocal(info={"replica": replica})
+    try:
+        yield db
+    finally:
+        db.close()
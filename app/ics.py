@@ -0,0 +1,112 @@
+from datetime import datetime
+from typing import Iterable, Iterator
+
+import models
+
+PRODID = "-//EventBoard//Events Feed//EN"
+
+
+def escape_text(text: str) -> str:
+    """Escapes a TEXT value as described in RFC 5545, section 3.3.11."""
+    if not text:
+        return ""
+    return (
+        text.replace("\\", "\\\\")
+        .replace(";", "\\;")
+        .replace(",", "\\,")
+        .replace("\r\n", "\\n")
+        .replace("\n", "\\n")
+    )
+
+
+def fold_line(line: str) -> str:
+    """Folds a content line to 75 octets and terminates it with CRLF."""
+    encoded = line.encode("utf-8")
+    if len(encoded) <= 75:
+        return line + "\r\n"
+
+    parts = []
+    current = b""
+    limit = 75
+    for char in line:
+        char_bytes = char.encode("utf-8")
+        if len(current) + len(char_bytes) > limit:
+            parts.append(current.decode("utf-8"))
+            current = b""
+            limit = 74  # continuation lines start with a space
+        current += char_bytes
+    parts.append(current.decode("utf-8"))
+    return "\r\n ".join(parts) + "\r\n"
+
+
+def format_datetime(value: datetime) -> str:
+    """Formats a naive UTC datetime as an iCalendar UTC DATE-TIME."""
+    return value.strftime("%Y%m%dT%H%M%SZ")
+
+
+def format_floating(value: datetime) -> str:
+    """
+    Formats a naive datetime as an iCalendar floating DATE-TIME (no ``Z``).
+
+    Event dates are stored as typed into the dashboard's datetime-local
+    inputs, i.e. wall-clock time at the event, so they must not be shifted
+    into the subscriber's timezone.
+    """
+    return value.strftime("%Y%m%dT%H%M%S")
+
+
+def calendar_header(name: str) -> str:
+    lines = [
+        "BEGIN:VCALENDAR",
+        "VERSION:2.0",
+        f"PRODID:{PRODID}",
+        "CALSCALE:GREGORIAN",
+        "METHOD:PUBLISH",
+        f"X-WR-CALNAME:{escape_text(name)}",
+    ]
+    return "".join(fold_line(line) for line in lines)
+
+
+def calendar_footer() -> str:
+    return fold_line("END:VCALENDAR")
+
+
+def serialize_event(event: models.Event, base_url: str) -> str:
+    """
+    Serializes an event as one VEVENT per scheduled date.
+
+    :param event: Event to serialize, with its dates loaded
+    :param base_url: Public base URL used for the UID host and event link
+    """
+    host = base_url.split("://", 1)[-1].split("/", 1)[0]
+    url = f"{base_url.rstrip('/')}/event/{event.id}"
+    stamp = format_datetime(event.updated_at or event.date)
+    dates = sorted(event.dates, key=lambda d: d.date) or [None]
+
+    chunks = []
+    for position, event_date in enumerate(dates):
+        start = event_date.date if event_date else event.date
+        # Keyed on the date's position, not its value or EventDate.id (edit_event
+        # recreates the rows), so rescheduling a date updates the same entry
+        uid = f"event-{event.id}-{position}@{host}"
+        lines = [
+            "BEGIN:VEVENT",
+            f"UID:{uid}",
+            f"DTSTAMP:{stamp}",
+            f"DTSTART:{format_floating(start)}",
+            f"SUMMARY:{escape_text(event.name)}",
+            f"DESCRIPTION:{escape_text(event.description)}",
+            f"LOCATION:{escape_text(event.location)}",
+            f"URL:{url}",
+            "END:VEVENT",
+        ]
+        chunks.append("".join(fold_line(line) for line in lines))
+    return "".join(chunks)
+
+
+def generate_calendar(events: Iterable[models.Event], base_url: str, name: str) -> Iterator[str]:
+    """Yields a full VCALENDAR document, one event at a time."""
+    yield calendar_header(name)
+    for event in events:
+        yield serialize_event(event, base_url)
+    yield calendar_footer()
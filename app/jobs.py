@@ -0,0 +1,266 @@
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Optional
+
+from sqlalchemy import and_, or_
+from sqlalchemy.orm import Session, sessionmaker
+
+import models
+
+logger = logging.getLogger(__name__)
+
+# Registered task handlers, keyed by job name
+_tasks: Dict[str, Callable[[dict], None]] = {}
+
+
+def task(name: str):
+    """Registers the decorated function as the handler for jobs named ``name``."""
+    def decorator(func: Callable[[dict], None]):
+        _tasks[name] = func
+        return func
+    return decorator
+
+
+def enqueue(db: Session, name: str, payload: Optional[dict] = None, idempotency_key: Optional[str] = None,
+            max_attempts: int = 5, delay: float = 0) -> models.Job:
+    """
+    Adds a job to the caller's session without committing it.
+
+    The job is only visible to workers once the caller commits, so it is
+    stored atomically with the change that caused it. Enqueueing a second
+    job with an ``idempotency_key`` that already exists returns the
+    existing job instead.
+    """
+    if idempotency_key:
+        for pending in db.new:
+            if isinstance(pending, models.Job) and pending.idempotency_key == idempotency_key:
+                return pending
+        existing = db.query(models.Job).filter(models.Job.idempotency_key == idempotency_key).first()
+        if existing:
+            return existing
+
+    job = models.Job(
+        name=name,
+        payload=payload or {},
+        status="pending",
+        attempts=0,
+        max_attempts=max_attempts,
+        idempotency_key=idempotency_key,
+        run_at=datetime.utcnow() + timedelta(seconds=delay),
+    )
+    db.add(job)
+    return job
+
+
+def cancel(db: Session, idempotency_key: str) -> bool:
+    """
+    Removes the pending job with ``idempotency_key`` as part of the caller's
+    session, so it is only gone once the caller commits.
+
+    :return: Whether there was a pending job to cancel
+    """
+    for pending in list(db.new):
+        if isinstance(pending, models.Job) and pending.idempotency_key == idempotency_key:
+            db.expunge(pending)
+            return True
+    deleted = (
+        db.query(models.Job)
+        .filter(models.Job.idempotency_key == idempotency_key, models.Job.status == "pending")
+        .delete(synchronize_session=False)
+    )
+    return bool(deleted)
+
+
+class JobWorker:
+    """
+    Polls the jobs table and runs due jobs on a bounded thread pool.
+
+    :param session_factory: Session factory used for claiming and running jobs
+    :param concurrency: Maximum number of jobs running at the same time
+    :param poll_interval: Seconds to sleep when there is nothing to claim
+    :param retry_backoff: Base delay in seconds, doubled on every failed attempt
+    :param lock_timeout: Seconds after which a running job is considered abandoned
+    :param retention_days: Days finished jobs are kept before ``sweep`` deletes them
+    :param sweep_interval: Seconds between two ``sweep`` runs
+    """
+
+    MAX_BACKOFF = 3600
+
+    def __init__(self, session_factory: sessionmaker, concurrency: int = 4, poll_interval: float = 1.0,
+                 retry_backoff: float = 2.0, lock_timeout: int = 300, retention_days: int = 7,
+                 sweep_interval: float = 300):
+        self.session_factory = session_factory
+        self.concurrency = concurrency
+        self.poll_interval = poll_interval
+        self.retry_backoff = retry_backoff
+        self.lock_timeout = lock_timeout
+        self.retention_days = retention_days
+        self.sweep_interval = sweep_interval
+        self._next_sweep = 0.0
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._slots = threading.BoundedSemaphore(concurrency)
+
+    def start(self):
+        """Runs the polling loop in a background thread."""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self.run_forever, name="job-worker", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 10):
+        """Stops polling and waits for running jobs to finish."""
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout)
+
+    def run_forever(self):
+        self._executor = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="job")
+        try:
+            while not self._stop.is_set():
+                if time.monotonic() >= self._next_sweep:
+                    try:
+                        self.sweep()
+                    except Exception:
+                        logger.exception("Job worker failed to sweep the queue")
+                    self._next_sweep = time.monotonic() + self.sweep_interval
+                try:
+                    claimed = self.run_pending()
+                except Exception:
+                    logger.exception("Job worker failed to poll the queue")
+                    claimed = 0
+                if not claimed:
+                    self._stop.wait(self.poll_interval)
+        finally:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+    def run_pending(self) -> int:
+        """
+        Claims as many due jobs as there are free slots and submits them.
+        Without a running executor (e.g. from a script) jobs run inline.
+
+        :return: Number of jobs claimed
+        """
+        claimed = 0
+        while self._slots.acquire(blocking=False):
+            job_id = self._claim()
+            if job_id is None:
+                self._slots.release()
+                break
+            claimed += 1
+            if self._executor:
+                self._executor.submit(self._run, job_id)
+            else:
+                self._run(job_id)
+        return claimed
+
+    def _stale(self, now: datetime):
+        return and_(models.Job.status == "running", models.Job.locked_at < now - timedelta(seconds=self.lock_timeout))
+
+    def sweep(self) -> int:
+        """
+        Housekeeping, run every ``sweep_interval`` seconds rather than on each
+        poll so an idle queue doesn't write to the database.
+
+        Fails jobs whose worker crashed or hung on their last allowed attempt
+        (``_claim`` no longer picks them up) and deletes jobs that finished
+        successfully more than ``retention_days`` ago. Failed jobs are kept
+        for inspection.
+
+        :return: Number of rows changed
+        """
+        db = self.session_factory()
+        try:
+            now = datetime.utcnow()
+            failed = (
+                db.query(models.Job)
+                .filter(self._stale(now), models.Job.attempts >= models.Job.max_attempts)
+                .update(
+                    {"status": "failed", "locked_at": None, "finished_at": now,
+                     "last_error": "Worker lock timed out on the last attempt"},
+                    synchronize_session=False,
+                )
+            )
+            pruned = (
+                db.query(models.Job)
+                .filter(models.Job.status == "done",
+                        models.Job.finished_at < now - timedelta(days=self.retention_days))
+                .delete(synchronize_session=False)
+            )
+            db.commit()
+            return failed + pruned
+        finally:
+            db.close()
+
+    def _claim(self) -> Optional[int]:
+        """Atomically moves one due job to ``running`` and returns its id."""
+        db = self.session_factory()
+        try:
+            now = datetime.utcnow()
+            stale = self._stale(now)
+            # Read-only unless there is something to claim
+            claimable = or_(
+                and_(models.Job.status == "pending", models.Job.run_at <= now),
+                and_(stale, models.Job.attempts < models.Job.max_attempts),
+            )
+            candidates = (
+                db.query(models.Job.id)
+                .filter(claimable)
+                .order_by(models.Job.run_at, models.Job.id)
+                .limit(self.concurrency)
+                .all()
+            )
+            for (job_id,) in candidates:
+                # Conditional update: only one worker can win the row
+                won = (
+                    db.query(models.Job)
+                    .filter(models.Job.id == job_id, claimable)
+                    .update(
+                        {"status": "running", "locked_at": now, "attempts": models.Job.attempts + 1},
+                        synchronize_session=False,
+                    )
+                )
+                db.commit()
+                if won:
+                    return job_id
+            return None
+        finally:
+            db.close()
+
+    def _run(self, job_id: int):
+        db = self.session_factory()
+        try:
+            job = db.get(models.Job, job_id)
+            if job is None:
+                logger.warning("Claimed job %s no longer exists", job_id)
+                return
+            handler = _tasks.get(job.name)
+            try:
+                if handler is None:
+                    raise LookupError(f"No task registered for job '{job.name}'")
+                handler(job.payload or {})
+            except Exception as e:
+                logger.exception("Job %s (%s) failed on attempt %s", job.id, job.name, job.attempts)
+                job.last_error = f"{type(e).__name__}: {e}"
+                if handler is None or job.attempts >= job.max_attempts:
+                    job.status = "failed"
+                    job.finished_at = datetime.utcnow()
+                else:
+                    delay = min(self.retry_backoff * 2 ** (job.attempts - 1), self.MAX_BACKOFF)
+                    job.status = "pending"
+                    job.run_at = datetime.utcnow() + timedelta(seconds=delay)
+            else:
+                job.status = "done"
+                job.last_error = None
+                job.finished_at = datetime.utcnow()
+            job.locked_at = None
+            db.commit()
+        finally:
+            db.close()
+            self._slots.release()
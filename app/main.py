@@ -6,14 +6,35 @@ from fastapi_pagination import add_pagination
 
 from config import settings, templates
 from utils import run_migrations
+from worker import build_worker
+from ratelimit import RateLimitMiddleware, RateLimitRule, ConcurrencyLimit, MemoryBackend, RedisBackend, min_page
 import models
-from database import engine
+from database import engine, replicas
 
 # Routers
-from routes import public, auth, backend
+from routes import public, auth, backend, calendar, uploads
 
 app = FastAPI(debug=settings.DEBUG)
 add_pagination(app)
+
+# Admission control, added before SessionMiddleware so it runs inside it and can see the session user
+app.add_middleware(
+    RateLimitMiddleware,
+    backend=RedisBackend(settings.RATE_LIMIT_REDIS_URL) if settings.RATE_LIMIT_BACKEND == "redis" else MemoryBackend(),
+    rules=[
+        RateLimitRule("login", ["POST"], [r"/login"], settings.RATE_LIMIT_LOGIN),
+        RateLimitRule("register", ["POST"], [r"/register"], settings.RATE_LIMIT_REGISTER),
+        RateLimitRule("upload", ["POST"], [r"/events", r"/events/\d+/edit"], settings.RATE_LIMIT_UPLOAD),
+        RateLimitRule("deep-pages", ["GET"], [r"/", r"/events"], settings.RATE_LIMIT_DEEP_PAGES,
+                      when=min_page(settings.RATE_LIMIT_DEEP_PAGE_FROM)),
+    ],
+    concurrency_limits=[
+        ConcurrencyLimit("hashing", ["POST"], [r"/login", r"/register"], settings.MAX_CONCURRENT_HASHING),
+        ConcurrencyLimit("uploads", ["POST"], [r"/events", r"/events/\d+/edit"], settings.MAX_CONCURRENT_UPLOADS),
+    ],
+    trusted_proxies=settings.RATE_LIMIT_TRUSTED_PROXIES,
+    enabled=settings.RATE_LIMIT_ENABLED,
+)
 app.add_middleware(SessionMiddleware, secret_key=settings.SECRET_KEY, max_age=settings.SESSION_AGE, same_site="lax")
 
 # Ensure uploads folder exists
@@ -23,13 +44,28 @@ os.makedirs(settings.UPLOAD_DIR, exist_ok=True)
 app.mount("/static", StaticFiles(directory="static"), name="static")
 
 
-# Run Alembic migrations on startup
+job_worker = build_worker()
+
+
+# Run Alembic migrations, compile templates and start background threads on startup
 @app.on_event("startup")
 def on_startup():
     run_migrations()
+    templates.prewarm()
+    replicas.start()
+    if settings.JOB_WORKER_ENABLED:
+        job_worker.start()
+
+
+@app.on_event("shutdown")
+def on_shutdown():
+    job_worker.stop()
+    replicas.stop()
 
 
-# Include routers
+# Include routers (calendar first, so /event/{id}.ics wins over /event/{id})
+app.include_router(calendar.router)
 app.include_router(public.router)
 app.include_router(auth.router)
 app.include_router(backend.router)
+app.include_router(uploads.router)
@@ -1,6 +1,7 @@
 from database import Base
 from .user import User
 from .event import Event, EventDate
+from .job import Job
 
 # This list helps when you do "from models import *"
-__all__ = ["Base", "User", "Event", "EventDate"]
\ No newline at end of file
+__all__ = ["Base", "User", "Event", "EventDate", "Job"]
\ No newline at end of file
@@ -15,6 +15,7 @@ class Event(Base):
     image_url = Column(String, nullable=True)
     is_featured = Column(Boolean, default=False)
     user_id = Column(Integer, ForeignKey("users.id"))
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
 
     # String references "User" and "EventDate"
     owner = relationship("User", back_populates="events")
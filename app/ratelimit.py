@@ -0,0 +1,294 @@
+import logging
+import math
+import re
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+from urllib.parse import parse_qs
+
+from starlette.responses import PlainTextResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+logger = logging.getLogger(__name__)
+
+PERIODS = {"second": 1, "minute": 60, "hour": 3600, "day": 86400}
+
+
+def parse_rate(rate: str) -> Tuple[int, float]:
+    """
+    Parses a rate such as ``"10/minute"`` or ``"10/30"`` (per 30 seconds).
+
+    :return: Bucket capacity and refill rate in tokens per second
+    """
+    count, _, period = rate.partition("/")
+    seconds = PERIODS[period.strip()] if period.strip() in PERIODS else float(period)
+    capacity = int(count)
+    return capacity, capacity / seconds
+
+
+class RateLimitRule:
+    """
+    Token bucket applied per client to the requests matching it.
+
+    :param name: Rule name, also used as part of the bucket key
+    :param methods: HTTP methods the rule applies to
+    :param paths: Regular expressions matched against the request path
+    :param rate: Bucket size and refill period, e.g. ``"10/minute"``
+    :param when: Optional extra condition on the ASGI scope
+    """
+
+    def __init__(self, name: str, methods: Iterable[str], paths: Iterable[str], rate: str,
+                 when: Optional[Callable[[Scope], bool]] = None):
+        self.name = name
+        self.methods = {m.upper() for m in methods}
+        self.paths = [re.compile(p) for p in paths]
+        self.capacity, self.refill_rate = parse_rate(rate)
+        self.when = when
+
+    def matches(self, scope: Scope) -> bool:
+        if scope["method"] not in self.methods:
+            return False
+        if not any(p.fullmatch(scope["path"]) for p in self.paths):
+            return False
+        return self.when is None or self.when(scope)
+
+
+class ConcurrencyLimit:
+    """
+    Caps how many matching requests run at the same time across all clients.
+
+    :param name: Limit name, used as the counter key
+    :param methods: HTTP methods the limit applies to
+    :param paths: Regular expressions matched against the request path
+    :param limit: Maximum number of requests in flight
+    """
+
+    def __init__(self, name: str, methods: Iterable[str], paths: Iterable[str], limit: int):
+        self.name = name
+        self.methods = {m.upper() for m in methods}
+        self.paths = [re.compile(p) for p in paths]
+        self.limit = limit
+
+    def matches(self, scope: Scope) -> bool:
+        return scope["method"] in self.methods and any(p.fullmatch(scope["path"]) for p in self.paths)
+
+
+def min_page(page: int) -> Callable[[Scope], bool]:
+    """Condition matching requests whose ``?page=`` is ``page`` or higher."""
+    def condition(scope: Scope) -> bool:
+        values = parse_qs(scope.get("query_string", b"").decode("latin-1")).get("page")
+        try:
+            return bool(values) and int(values[0]) >= page
+        except ValueError:
+            return False
+    return condition
+
+
+class MemoryBackend:
+    """
+    Process-local buckets and counters. Limits apply per worker process.
+
+    At most ``max_buckets`` buckets are kept; beyond that the least recently
+    used one is dropped, which at worst gives that client a fresh bucket.
+    """
+
+    def __init__(self, max_buckets: int = 10000):
+        self.max_buckets = max_buckets
+        # key -> (tokens, last update), least recently used first
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+        self._counters: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    async def take(self, key: str, capacity: int, refill_rate: float) -> float:
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.pop(key, (capacity, now))
+            tokens = min(capacity, tokens + (now - updated) * refill_rate)
+            wait = 0.0
+            if tokens >= 1:
+                tokens -= 1
+            else:
+                wait = (1 - tokens) / refill_rate
+            self._buckets[key] = (tokens, now)
+            if len(self._buckets) > self.max_buckets:
+                self._buckets.popitem(last=False)
+        return wait
+
+    async def acquire(self, key: str, limit: int) -> Optional[str]:
+        with self._lock:
+            if self._counters.get(key, 0) >= limit:
+                return None
+            self._counters[key] = self._counters.get(key, 0) + 1
+            return key
+
+    async def release(self, key: str, slot: str):
+        with self._lock:
+            self._counters[key] = max(0, self._counters.get(key, 0) - 1)
+
+
+class RedisBackend:
+    """
+    Buckets and counters shared by every worker through a Redis-protocol
+    server (Redis, Valkey, KeyDB...). Requires the ``redis`` package.
+
+    Concurrency slots are members of a sorted set scored by their start
+    time, so a slot never released (crashed worker) drops out after
+    ``slot_ttl`` seconds regardless of traffic. If Redis is unreachable,
+    requests are let through and the error is logged.
+    """
+
+    TAKE_SCRIPT = """
+    local capacity = tonumber(ARGV[1])
+    local rate = tonumber(ARGV[2])
+    local t = redis.call('TIME')
+    local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+    local data = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+    local tokens = tonumber(data[1]) or capacity
+    local ts = tonumber(data[2]) or now
+    tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+    local wait = 0
+    if tokens >= 1 then
+        tokens = tokens - 1
+    else
+        wait = (1 - tokens) / rate
+    end
+    redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+    redis.call('EXPIRE', KEYS[1], math.ceil(capacity / rate) + 1)
+    return tostring(wait)
+    """
+
+    ACQUIRE_SCRIPT = """
+    local limit = tonumber(ARGV[1])
+    local ttl = tonumber(ARGV[2])
+    local t = redis.call('TIME')
+    local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+    redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', now - ttl)
+    if redis.call('ZCARD', KEYS[1]) >= limit then
+        return 0
+    end
+    redis.call('ZADD', KEYS[1], now, ARGV[3])
+    redis.call('EXPIRE', KEYS[1], math.ceil(ttl))
+    return 1
+    """
+
+    def __init__(self, url: str, prefix: str = "ratelimit:", slot_ttl: int = 300):
+        try:
+            import redis
+            from redis import asyncio as redis_asyncio
+        except ImportError as e:
+            raise RuntimeError("RATE_LIMIT_BACKEND=redis requires the 'redis' package") from e
+        self.errors = redis.RedisError
+        self.client = redis_asyncio.from_url(url)
+        self.prefix = prefix
+        # slots held longer than this (e.g. by a crashed worker) are reclaimed
+        self.slot_ttl = slot_ttl
+        self._take = self.client.register_script(self.TAKE_SCRIPT)
+        self._acquire = self.client.register_script(self.ACQUIRE_SCRIPT)
+
+    async def take(self, key: str, capacity: int, refill_rate: float) -> float:
+        try:
+            wait = await self._take(keys=[self.prefix + key], args=[capacity, refill_rate])
+        except self.errors:
+            logger.exception("Rate limit check failed, letting the request through")
+            return 0.0
+        return float(wait)
+
+    async def acquire(self, key: str, limit: int) -> Optional[str]:
+        slot = uuid.uuid4().hex
+        try:
+            acquired = await self._acquire(keys=[self.prefix + "slots:" + key], args=[limit, self.slot_ttl, slot])
+        except self.errors:
+            logger.exception("Concurrency check failed, letting the request through")
+            return slot
+        return slot if acquired else None
+
+    async def release(self, key: str, slot: str):
+        try:
+            await self.client.zrem(self.prefix + "slots:" + key, slot)
+        except self.errors:
+            logger.exception("Could not release concurrency slot, it expires after %ss", self.slot_ttl)
+
+
+class RateLimitMiddleware:
+    """
+    Admission control for expensive routes.
+
+    Requests over a rule's token bucket get ``429 Too Many Requests`` and
+    requests arriving while a concurrency limit is full get
+    ``503 Service Unavailable``, both with a ``Retry-After`` header.
+    Clients are identified by their session user, falling back to their IP,
+    so this middleware must run inside SessionMiddleware.
+
+    :param trusted_proxies: Number of reverse proxies in front of the app.
+        Each appends the address it received the request from to
+        ``X-Forwarded-For``, so the client is the entry that many places
+        from the right; anything further left is sent by the client itself
+        and can be forged. 0 ignores the header.
+    """
+
+    def __init__(self, app: ASGIApp, backend, rules: List[RateLimitRule] = (),
+                 concurrency_limits: List[ConcurrencyLimit] = (), trusted_proxies: int = 0,
+                 enabled: bool = True):
+        self.app = app
+        self.backend = backend
+        self.rules = list(rules)
+        self.concurrency_limits = list(concurrency_limits)
+        self.trusted_proxies = trusted_proxies
+        self.enabled = enabled
+
+    def client_id(self, scope: Scope) -> str:
+        user = scope.get("session", {}).get("user")
+        if user:
+            return f"user:{user}"
+        if self.trusted_proxies:
+            forwarded = [
+                address.strip()
+                for name, value in scope.get("headers", [])
+                if name == b"x-forwarded-for"
+                for address in value.decode("latin-1").split(",")
+            ]
+            # Fewer entries than proxies: the request skipped a proxy, so don't trust the header
+            if len(forwarded) >= self.trusted_proxies:
+                return f"ip:{forwarded[-self.trusted_proxies]}"
+        client = scope.get("client")
+        return f"ip:{client[0] if client else 'unknown'}"
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or not self.enabled:
+            await self.app(scope, receive, send)
+            return
+
+        client = None
+        for rule in self.rules:
+            if not rule.matches(scope):
+                continue
+            client = client or self.client_id(scope)
+            wait = await self.backend.take(f"{rule.name}:{client}", rule.capacity, rule.refill_rate)
+            if wait > 0:
+                response = PlainTextResponse(
+                    "Too many requests, please try again later.", status_code=429,
+                    headers={"Retry-After": str(math.ceil(wait))},
+                )
+                await response(scope, receive, send)
+                return
+
+        held = []
+        try:
+            for limit in self.concurrency_limits:
+                if not limit.matches(scope):
+                    continue
+                slot = await self.backend.acquire(limit.name, limit.limit)
+                if slot is None:
+                    response = PlainTextResponse(
+                        "Server is busy, please try again shortly.", status_code=503,
+                        headers={"Retry-After": "1"},
+                    )
+                    await response(scope, receive, send)
+                    return
+                held.append((limit.name, slot))
+            await self.app(scope, receive, send)
+        finally:
+            for name, slot in held:
+                await self.backend.release(name, slot)
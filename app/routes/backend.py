@@ -1,22 +1,66 @@
-import os, shutil, uuid
 from datetime import datetime
-from typing import List
+from typing import List, Optional, Tuple
 from fastapi import APIRouter, Depends, Request, Form, UploadFile, File, status
+from fastapi.concurrency import run_in_threadpool
 from fastapi.responses import HTMLResponse, RedirectResponse
 from sqlalchemy.orm import Session
 from fastapi_pagination import Params
 from fastapi_pagination.ext.sqlalchemy import paginate
-from database import get_db
+from database import get_db, mark_recent_write
 import models
 from schemas import EventCreate  # Correctly imported
 from utils import get_current_user, sanitize_input
+from jobs import enqueue
+from storage import storage
+from tasks import claim_upload
 from config import templates
+from templating import Deferred
 
 from config import settings
 
 router = APIRouter()
 
 
+def _store_image(request: Request, current_user: models.User, image_file: Optional[UploadFile],
+                 image_key: Optional[str]) -> Tuple[Optional[str], Optional[str]]:
+    """
+    Resolves the image submitted with an event form.
+
+    Either the browser already uploaded it to storage (``image_key``) or the
+    file came with the form and is saved here, so call this once the rest of
+    the form is valid. Storage calls may block on the network, so call this
+    through run_in_threadpool.
+
+    :return: The image URL (None if no image was sent) and an error message
+    """
+    base_url = str(request.base_url)
+    if image_key:
+        if not storage.owns(image_key, current_user.id) or not storage.exists(image_key):
+            return None, "Error: Uploaded image not found."
+        return storage.url(image_key, base_url), None
+
+    if image_file and image_file.filename:
+        # File Size Validation
+        image_file.file.seek(0, 2)
+        file_size = image_file.file.tell()
+        image_file.file.seek(0)
+        if file_size > settings.MAX_UPLOAD_SIZE:
+            return None, f"Error: Image file is too large (Max {settings.MAX_UPLOAD_SIZE // (1024 * 1024)}MB)."
+
+        key = storage.new_key(image_file.filename, current_user.id)
+        storage.save(image_file.file, key, image_file.content_type)
+        return storage.url(key, base_url), None
+
+    return None, None
+
+
+def _delete_image_later(db: Session, image_url: Optional[str]):
+    """Queues removal of a stored image; runs only if the caller commits."""
+    key = storage.key_from_url(image_url)
+    if key:
+        enqueue(db, "delete_upload", {"key": key}, idempotency_key=f"delete_upload:{key}")
+
+
 @router.get("/dashboard", response_class=HTMLResponse)
 async def dashboard(
     request: Request, db: Session = Depends(get_db), params: Params = Depends()
@@ -32,16 +76,18 @@ async def dashboard(
     success = request.session.pop("success", None)
 
     query = db.query(models.Event).order_by(models.Event.id.desc())
-    page_data = paginate(db, query, params=params)
 
-    return templates.TemplateResponse(
+    return templates.StreamingTemplateResponse(
         "dashboard.html",
         {
             "request": request,
-            "events_page": page_data,
+            # Deferred: paginated while rendering, after the page head is sent when streaming
+            "events_page": Deferred(lambda: paginate(db, query, params=params)),
             "user": current_user,
             "error_message": error,
             "success_message": success,
+            "direct_uploads": storage.supports_direct_upload,
+            "max_upload_mb": settings.MAX_UPLOAD_SIZE // (1024 * 1024),
         },
     )
 
@@ -54,6 +100,7 @@ async def create_event(
     additional_dates: List[str] = Form(...),
     location: str = Form(...),
     image_file: UploadFile = File(None),
+    image_key: Optional[str] = Form(None),
     is_featured: bool = Form(False),
     db: Session = Depends(get_db),
 ):
@@ -61,37 +108,6 @@ async def create_event(
     if not current_user:
         return RedirectResponse(url="/login", status_code=status.HTTP_303_SEE_OTHER)
 
-    # 1. Image Handling
-    final_image_url = None
-    if image_file and image_file.filename:
-
-        # Ensure uploads directory exists
-        upload_dir = os.path.join("static", "uploads")
-        os.makedirs(upload_dir, exist_ok=True)
-
-        # File Size Validation (10MB)
-        image_file.file.seek(0, 2)
-        file_size = image_file.file.tell()
-        image_file.file.seek(0)
-        if file_size > 10 * 1024 * 1024:
-            request.session["error"] = "Error: Image file is too large (Max 10MB)."
-            return RedirectResponse(
-                url="/dashboard", status_code=status.HTTP_303_SEE_OTHER
-            )
-
-        file_ext = os.path.splitext(image_file.filename)[1]
-        unique_filename = f"{uuid.uuid4()}{file_ext}"
-        file_path = os.path.join(settings.UPLOAD_DIR, unique_filename)
-
-        with open(file_path, "wb") as buffer:
-            shutil.copyfileobj(image_file.file, buffer)
-
-        # Generate URL dynamically based on UPLOAD_DIR
-        relative_path = os.path.relpath(settings.UPLOAD_DIR, "static")  # e.g., "uploads"
-        final_image_url = (
-            f"{str(request.base_url).rstrip('/')}/static/{relative_path}/{unique_filename}"
-        )
-
     # Schema Validation (Internal usage of Pydantic)
     try:
         # We pass the raw data through the schema to validate types and required fields
@@ -102,7 +118,6 @@ async def create_event(
             date=datetime.fromisoformat(additional_dates[0]),
             additional_dates=[datetime.fromisoformat(d) for d in additional_dates],
             is_featured=is_featured,
-            image_url=final_image_url,
         )
     except Exception as e:
         request.session["error"] = f"Validation Error: {str(e)}"
@@ -127,13 +142,21 @@ async def create_event(
         request.session["error"] = "Error: Event dates cannot be in the past."
         return RedirectResponse(url="/dashboard", status_code=status.HTTP_303_SEE_OTHER)
 
+    # Image Handling, once the form is valid so rejected forms don't store files
+    final_image_url, error = await run_in_threadpool(_store_image, request, current_user, image_file, image_key)
+    if error:
+        request.session["error"] = error
+        return RedirectResponse(
+            url="/dashboard", status_code=status.HTTP_303_SEE_OTHER
+        )
+
     # Database Persistence
     new_event = models.Event(
         name=clean_name,
         description=event_data.description,
         location=clean_location,
         date=sorted_dates[0],
-        image_url=event_data.image_url,
+        image_url=final_image_url,
         is_featured=event_data.is_featured,
         user_id=current_user.id,
     )
@@ -142,8 +165,11 @@ async def create_event(
     for d in sorted_dates:
         new_event.dates.append(models.EventDate(date=d))
 
+    if image_key:
+        claim_upload(db, image_key)
     db.add(new_event)
     db.commit()
+    mark_recent_write(request)
 
     request.session["success"] = (
         f"Success! '{clean_name}' created with {len(sorted_dates)} dates."
@@ -166,15 +192,12 @@ async def delete_event(event_id: int, request: Request, db: Session = Depends(ge
         request.session["error"] = "Event not found or unauthorized."
         return RedirectResponse(url="/dashboard", status_code=status.HTTP_303_SEE_OTHER)
 
-    # Delete local image file if it exists
-    if event.image_url and "/static/uploads/" in event.image_url:
-        filename = event.image_url.split("/")[-1]
-        old_file_path = os.path.join(settings.UPLOAD_DIR, filename)
-        if os.path.exists(old_file_path):
-            os.remove(old_file_path)
+    # Delete the stored image in the background once the event is gone
+    _delete_image_later(db, event.image_url)
 
     db.delete(event)
     db.commit()
+    mark_recent_write(request)
     request.session["success"] = "Event deleted successfully."
     return RedirectResponse(url="/dashboard", status_code=status.HTTP_303_SEE_OTHER)
 
@@ -188,6 +211,7 @@ async def edit_event(
     additional_dates: List[str] = Form(...),
     location: str = Form(...),
     image_file: UploadFile = File(None),
+    image_key: Optional[str] = Form(None),
     is_featured: bool = Form(False),
     db: Session = Depends(get_db),
 ):
@@ -204,37 +228,25 @@ async def edit_event(
         request.session["error"] = "Event not found."
         return RedirectResponse(url="/dashboard", status_code=status.HTTP_303_SEE_OTHER)
 
-    # Image Handling (Replace and Delete Old)
-    final_image_url = event.image_url
-    if image_file and image_file.filename:
-        # Delete old file
-        if event.image_url and "/static/uploads/" in event.image_url:
-            old_filename = event.image_url.split("/")[-1]
-            old_path = os.path.join(settings.UPLOAD_DIR, old_filename)
-            if os.path.exists(old_path):
-                os.remove(old_path)
-
-        os.makedirs(settings.UPLOAD_DIR, exist_ok=True)
-
-        # Save new file
-        file_ext = os.path.splitext(image_file.filename)[1]
-        unique_filename = f"{uuid.uuid4()}{file_ext}"
-        file_path = os.path.join(settings.UPLOAD_DIR, unique_filename)
-        with open(file_path, "wb") as buffer:
-            shutil.copyfileobj(image_file.file, buffer)
-
-        # Generate URL dynamically
-        relative_path = os.path.relpath(settings.UPLOAD_DIR, "static")
-        final_image_url = (
-            f"{str(request.base_url).rstrip('/')}/static/{relative_path}/{unique_filename}"
-        )
-
     #  Sanitize and Validate
     event_dates = sorted([datetime.fromisoformat(d) for d in additional_dates])
     if event_dates[0] < datetime.utcnow():
         request.session["error"] = "Error: Event dates cannot be in the past."
         return RedirectResponse(url="/dashboard", status_code=status.HTTP_303_SEE_OTHER)
 
+    # Image Handling (Replace and Delete Old)
+    final_image_url, error = await run_in_threadpool(_store_image, request, current_user, image_file, image_key)
+    if error:
+        request.session["error"] = error
+        return RedirectResponse(url="/dashboard", status_code=status.HTTP_303_SEE_OTHER)
+    if final_image_url and final_image_url != event.image_url:
+        # Delete old file in the background, after the new one is committed
+        _delete_image_later(db, event.image_url)
+    else:
+        final_image_url = event.image_url
+    if image_key:
+        claim_upload(db, image_key)
+
     #  Update Event Object
     event.name = sanitize_input(name).capitalize()
     event.description = sanitize_input(description)
@@ -242,6 +254,7 @@ async def edit_event(
     event.date = event_dates[0]
     event.image_url = final_image_url
     event.is_featured = is_featured
+    event.updated_at = datetime.utcnow()  # dates alone changing would not touch the row
 
     #  Update Dates (Clear old and add new)
     db.query(models.EventDate).filter(models.EventDate.event_id == event.id).delete()
@@ -249,5 +262,6 @@ async def edit_event(
         event.dates.append(models.EventDate(date=d))
 
     db.commit()
+    mark_recent_write(request)
     request.session["success"] = "Event updated successfully!"
     return RedirectResponse(url="/dashboard", status_code=status.HTTP_303_SEE_OTHER)
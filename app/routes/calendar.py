@@ -0,0 +1,112 @@
+import hashlib
+from collections import OrderedDict
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Iterator, Optional
+
+from fastapi import APIRouter, Depends, Request, HTTPException
+from fastapi.responses import Response, StreamingResponse
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session, selectinload
+from database import get_read_db
+import models
+import ics
+
+from config import settings
+
+router = APIRouter()
+
+ICS_MEDIA_TYPE = "text/calendar; charset=utf-8"
+FEED_CACHE_SIZE = 16
+
+# Serialized feeds keyed on their ETag, so repeated polls skip the DB walk
+_feed_cache: "OrderedDict[str, bytes]" = OrderedDict()
+
+
+def _make_etag(*parts) -> str:
+    digest = hashlib.md5(":".join(str(p) for p in parts).encode("utf-8")).hexdigest()
+    return f'"{digest}"'
+
+
+def _is_not_modified(request: Request, etag: str, last_modified: Optional[datetime]) -> bool:
+    """Evaluates If-None-Match / If-Modified-Since against the current feed version."""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match:
+        tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+        return "*" in tags or etag in tags
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since and last_modified:
+        try:
+            since = parsedate_to_datetime(if_modified_since).replace(tzinfo=None)
+        except (TypeError, ValueError):
+            return False
+        return last_modified.replace(microsecond=0) <= since
+    return False
+
+
+def _cache_headers(etag: str, last_modified: Optional[datetime]) -> dict:
+    headers = {"ETag": etag, "Cache-Control": f"public, max-age={settings.ICS_CACHE_MAX_AGE}"}
+    if last_modified:
+        headers["Last-Modified"] = format_datetime(last_modified.replace(microsecond=0, tzinfo=timezone.utc), usegmt=True)
+    return headers
+
+
+def _store_feed(etag: str, body: bytes):
+    _feed_cache[etag] = body
+    _feed_cache.move_to_end(etag)
+    while len(_feed_cache) > FEED_CACHE_SIZE:
+        _feed_cache.popitem(last=False)
+
+
+def _stream_and_cache(etag: str, chunks: Iterator[str]) -> Iterator[bytes]:
+    """Streams the feed to the client and caches it once fully generated."""
+    body = []
+    for chunk in chunks:
+        data = chunk.encode("utf-8")
+        body.append(data)
+        yield data
+    _store_feed(etag, b"".join(body))
+
+
+@router.get("/events.ics")
+def events_feed(request: Request, db: Session = Depends(get_read_db)):
+    base_url = str(request.base_url)
+    last_modified, total_events = db.query(func.max(models.Event.updated_at), func.count(models.Event.id)).one()
+    etag = _make_etag("feed", base_url, total_events, last_modified.isoformat() if last_modified else "")
+    headers = _cache_headers(etag, last_modified)
+
+    if _is_not_modified(request, etag, last_modified):
+        return Response(status_code=304, headers=headers)
+
+    cached = _feed_cache.get(etag)
+    if cached is not None:
+        return Response(cached, media_type=ICS_MEDIA_TYPE, headers=headers)
+
+    # Server-side cursor: events are fetched and serialized in batches
+    events = db.scalars(
+        select(models.Event)
+        .options(selectinload(models.Event.dates))
+        .order_by(models.Event.id)
+        .execution_options(yield_per=100)
+    )
+    chunks = ics.generate_calendar(events, base_url, "EventBoard")
+    return StreamingResponse(_stream_and_cache(etag, chunks), media_type=ICS_MEDIA_TYPE, headers=headers)
+
+
+@router.get("/event/{event_id}.ics")
+def event_feed(event_id: int, request: Request, db: Session = Depends(get_read_db)):
+    event = db.query(models.Event).filter(models.Event.id == event_id).first()
+    if not event:
+        raise HTTPException(status_code=404, detail="Event not found")
+
+    last_modified = event.updated_at
+    etag = _make_etag("event", str(request.base_url), event.id, last_modified.isoformat() if last_modified else "")
+    headers = _cache_headers(etag, last_modified)
+
+    if _is_not_modified(request, etag, last_modified):
+        return Response(status_code=304, headers=headers)
+
+    headers["Content-Disposition"] = f'attachment; filename="event-{event.id}.ics"'
+    body = "".join(ics.generate_calendar([event], str(request.base_url), event.name))
+    return Response(body, media_type=ICS_MEDIA_TYPE, headers=headers)
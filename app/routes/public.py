@@ -1,16 +1,18 @@
 import json
 import math
 from datetime import datetime
+from types import SimpleNamespace
 
 from pydantic import Json
 from fastapi import APIRouter, Depends, Request, HTTPException
 from fastapi.params import Query
 from fastapi.responses import HTMLResponse
 from sqlalchemy.orm import Session
-from database import get_db
+from database import get_read_db
 import models
 from utils import get_current_user
 from config import templates
+from templating import Deferred
 from fastapi import HTTPException
 
 router = APIRouter()
@@ -18,28 +20,32 @@ router = APIRouter()
 
 @router.get("/", response_class=HTMLResponse)
 @router.get("/events", response_class=HTMLResponse)
-async def home(request: Request, db: Session = Depends(get_db), page: int = Query(1, ge=1)):
+async def home(request: Request, db: Session = Depends(get_read_db), page: int = Query(1, ge=1)):
     current_user = await get_current_user(request, db)
     error = request.session.pop("error", None)
     success = request.session.pop("success", None)
 
     items_per_page = 5
     offset = (page - 1) * items_per_page
-    events = db.query(models.Event).order_by(models.Event.id.desc()).offset(offset).limit(items_per_page).all()
-    total_events = db.query(models.Event).count()
-    total_pages = math.ceil(total_events / items_per_page)
 
-    return templates.TemplateResponse("index.html", {
-        "request": request, "events": events,
-        "featured": db.query(models.Event).filter(models.Event.is_featured == True).limit(5).all(),
-        "user": current_user, "page": page, "total_pages": total_pages,
-        "has_next": total_events > (offset + items_per_page),
+    def count_pages():
+        total_events = db.query(models.Event).count()
+        return SimpleNamespace(total_pages=math.ceil(total_events / items_per_page),
+                               has_next=total_events > (offset + items_per_page))
+
+    # Deferred: the queries run during rendering, after the page head is sent when streaming
+    return templates.StreamingTemplateResponse("index.html", {
+        "request": request,
+        "events": Deferred(db.query(models.Event).order_by(models.Event.id.desc()).offset(offset).limit(items_per_page).all),
+        "featured": Deferred(db.query(models.Event).filter(models.Event.is_featured == True).limit(5).all),
+        "pages": Deferred(count_pages),
+        "user": current_user, "page": page,
         "has_prev": page > 1, "now": datetime.utcnow(), "error_message": error, "success_message": success
     })
 
 
 @router.get("/event/{event_id}", response_class=HTMLResponse)
-async def event_detail(event_id: int, request: Request, db: Session = Depends(get_db)):
+async def event_detail(event_id: int, request: Request, db: Session = Depends(get_read_db)):
     current_user = await get_current_user(request, db)
     event = db.query(models.Event).filter(models.Event.id == event_id).first()
     if not event:
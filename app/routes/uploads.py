@@ -0,0 +1,50 @@
+from fastapi import APIRouter, Depends, Request, Form, HTTPException
+from fastapi.responses import JSONResponse, RedirectResponse
+from sqlalchemy.orm import Session
+from database import get_db
+from utils import get_current_user
+from storage import storage
+from tasks import discard_unless_claimed
+
+from config import settings
+
+router = APIRouter()
+
+
+@router.post("/uploads/presign")
+async def presign_upload(
+    request: Request,
+    filename: str = Form(...),
+    content_type: str = Form(...),
+    db: Session = Depends(get_db),
+):
+    """Issues a presigned POST so the browser can upload an event image straight to storage."""
+    current_user = await get_current_user(request, db)
+    if not current_user:
+        raise HTTPException(status_code=401, detail="Login required")
+    if not storage.supports_direct_upload:
+        raise HTTPException(status_code=404, detail="Direct uploads are not enabled")
+    if not content_type.startswith("image/"):
+        raise HTTPException(status_code=400, detail="Only images can be uploaded")
+
+    key = storage.new_key(filename, current_user.id)
+    presigned = storage.presign_upload(key, content_type, settings.MAX_UPLOAD_SIZE)
+    # Deleted later unless an event form commits the key
+    discard_unless_claimed(db, key)
+    db.commit()
+    return JSONResponse({"url": presigned["url"], "fields": presigned["fields"], "key": key})
+
+
+@router.get("/media/{key:path}")
+def media(key: str):
+    """Redirects to a short-lived download URL, so image bytes are served by storage."""
+    # Only event images are exposed, not arbitrary objects in the bucket
+    if not storage.supports_direct_upload or not storage.is_upload_key(key):
+        raise HTTPException(status_code=404, detail="Not found")
+    # Browsers may reuse the redirect for a while, but not past the URL's expiry
+    max_age = max(0, settings.S3_PRESIGN_EXPIRY // 2)
+    return RedirectResponse(
+        storage.presign_download(key),
+        status_code=307,
+        headers={"Cache-Control": f"private, max-age={max_age}"},
+    )
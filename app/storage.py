@@ -0,0 +1,208 @@
+import os
+import shutil
+import uuid
+from abc import ABC, abstractmethod
+from typing import BinaryIO, Optional
+
+from config import settings
+
+
+class Storage(ABC):
+    """
+    Where uploaded event images live.
+
+    Images are addressed by a storage key; ``url`` turns a key into the
+    URL saved in ``Event.image_url`` and ``key_from_url`` reverses it.
+    Backends that support direct uploads also implement the presign methods.
+    """
+
+    # Whether browsers can upload straight to the backend (see presign_upload)
+    supports_direct_upload = False
+
+    @abstractmethod
+    def new_key(self, filename: str, owner_id: int) -> str:
+        ...
+
+    @abstractmethod
+    def save(self, fileobj: BinaryIO, key: str, content_type: Optional[str] = None):
+        ...
+
+    @abstractmethod
+    def delete(self, key: str):
+        """Deletes the object. Deleting a missing object is not an error."""
+
+    @abstractmethod
+    def exists(self, key: str) -> bool:
+        ...
+
+    @abstractmethod
+    def url(self, key: str, base_url: str) -> str:
+        ...
+
+    @abstractmethod
+    def key_from_url(self, url: str) -> Optional[str]:
+        """Returns the key behind ``url``, or None if it isn't stored here."""
+
+    @abstractmethod
+    def is_upload_key(self, key: str) -> bool:
+        """Whether ``key`` is an event image key this backend could have issued."""
+
+    @abstractmethod
+    def owns(self, key: str, owner_id: int) -> bool:
+        """Whether ``key`` was issued by ``new_key`` for ``owner_id``."""
+
+    def presign_upload(self, key: str, content_type: str, max_size: int) -> dict:
+        raise NotImplementedError(f"{type(self).__name__} does not support direct uploads")
+
+    def presign_download(self, key: str) -> str:
+        raise NotImplementedError(f"{type(self).__name__} does not support direct downloads")
+
+
+class LocalStorage(Storage):
+    """Files in UPLOAD_DIR, served by the app's /static mount."""
+
+    def __init__(self, directory: str, static_dir: str = "static"):
+        self.directory = directory
+        self.url_path = f"/static/{os.path.relpath(directory, static_dir)}/"  # e.g. "/static/uploads/"
+
+    def new_key(self, filename: str, owner_id: int) -> str:
+        return f"{uuid.uuid4()}{os.path.splitext(filename)[1]}"
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, os.path.basename(key))
+
+    def save(self, fileobj: BinaryIO, key: str, content_type: Optional[str] = None):
+        os.makedirs(self.directory, exist_ok=True)
+        with open(self._path(key), "wb") as buffer:
+            shutil.copyfileobj(fileobj, buffer)
+
+    def delete(self, key: str):
+        if os.path.exists(self._path(key)):
+            os.remove(self._path(key))
+
+    def exists(self, key: str) -> bool:
+        return os.path.exists(self._path(key))
+
+    def url(self, key: str, base_url: str) -> str:
+        return f"{base_url.rstrip('/')}{self.url_path}{key}"
+
+    def key_from_url(self, url: str) -> Optional[str]:
+        if url and self.url_path in url:
+            return url.split("/")[-1]
+        return None
+
+    def is_upload_key(self, key: str) -> bool:
+        return bool(key) and key == os.path.basename(key) and key not in (".", "..")
+
+    def owns(self, key: str, owner_id: int) -> bool:
+        # local keys carry no owner; browsers never upload here directly
+        return False
+
+
+class S3Storage(Storage):
+    """
+    Objects in an S3-compatible bucket (AWS S3, MinIO, ...).
+
+    Browsers upload with presigned POSTs and download either from
+    ``public_url`` (public bucket or CDN) or through ``/media/{key}``, which
+    redirects to a short-lived presigned GET. Image bytes never pass through
+    the app, except for the plain form upload fallback. Requires ``boto3``.
+    """
+
+    supports_direct_upload = True
+
+    def __init__(self, bucket: str, endpoint_url: Optional[str] = None, region: Optional[str] = None,
+                 access_key_id: Optional[str] = None, secret_access_key: Optional[str] = None,
+                 public_url: Optional[str] = None, presign_expiry: int = 3600, prefix: str = "uploads/"):
+        try:
+            import boto3
+            from botocore.config import Config
+        except ImportError as e:
+            raise RuntimeError("STORAGE_BACKEND=s3 requires the 'boto3' package") from e
+        self.client = boto3.client(
+            "s3",
+            endpoint_url=endpoint_url,
+            region_name=region,
+            aws_access_key_id=access_key_id,
+            aws_secret_access_key=secret_access_key,
+            config=Config(signature_version="s3v4"),
+        )
+        self.bucket = bucket
+        self.public_url = public_url.rstrip("/") if public_url else None
+        self.presign_expiry = presign_expiry
+        self.prefix = prefix
+
+    def new_key(self, filename: str, owner_id: int) -> str:
+        return f"{self.prefix}{owner_id}/{uuid.uuid4()}{os.path.splitext(filename)[1]}"
+
+    def save(self, fileobj: BinaryIO, key: str, content_type: Optional[str] = None):
+        extra = {"ContentType": content_type} if content_type else None
+        self.client.upload_fileobj(fileobj, self.bucket, key, ExtraArgs=extra)
+
+    def delete(self, key: str):
+        self.client.delete_object(Bucket=self.bucket, Key=key)
+
+    def exists(self, key: str) -> bool:
+        from botocore.exceptions import ClientError
+        try:
+            self.client.head_object(Bucket=self.bucket, Key=key)
+        except ClientError:
+            return False
+        return True
+
+    def url(self, key: str, base_url: str) -> str:
+        if self.public_url:
+            return f"{self.public_url}/{key}"
+        return f"{base_url.rstrip('/')}/media/{key}"
+
+    def key_from_url(self, url: str) -> Optional[str]:
+        if not url:
+            return None
+        if self.public_url and url.startswith(self.public_url + "/"):
+            return url[len(self.public_url) + 1:]
+        if "/media/" in url:
+            return url.split("/media/", 1)[1]
+        return None
+
+    def is_upload_key(self, key: str) -> bool:
+        return key.startswith(self.prefix) and ".." not in key
+
+    def owns(self, key: str, owner_id: int) -> bool:
+        return self.is_upload_key(key) and key.startswith(f"{self.prefix}{owner_id}/")
+
+    def presign_upload(self, key: str, content_type: str, max_size: int) -> dict:
+        """Presigned POST limited to one key, an image content type and ``max_size`` bytes."""
+        return self.client.generate_presigned_post(
+            self.bucket,
+            key,
+            Fields={"Content-Type": content_type},
+            Conditions=[
+                {"Content-Type": content_type},
+                ["content-length-range", 1, max_size],
+            ],
+            ExpiresIn=self.presign_expiry,
+        )
+
+    def presign_download(self, key: str) -> str:
+        return self.client.generate_presigned_url(
+            "get_object", Params={"Bucket": self.bucket, "Key": key}, ExpiresIn=self.presign_expiry
+        )
+
+
+def build_storage() -> Storage:
+    """Creates the storage backend selected by STORAGE_BACKEND."""
+    if settings.STORAGE_BACKEND == "s3":
+        return S3Storage(
+            settings.S3_BUCKET,
+            endpoint_url=settings.S3_ENDPOINT_URL,
+            region=settings.S3_REGION,
+            access_key_id=settings.S3_ACCESS_KEY_ID,
+            secret_access_key=settings.S3_SECRET_ACCESS_KEY,
+            public_url=settings.S3_PUBLIC_URL,
+            presign_expiry=settings.S3_PRESIGN_EXPIRY,
+        )
+    return LocalStorage(settings.UPLOAD_DIR)
+
+
+# Shared storage instance
+storage = build_storage()
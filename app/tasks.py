@@ -0,0 +1,25 @@
+from sqlalchemy.orm import Session
+
+from jobs import cancel, enqueue, task
+from storage import storage
+from config import settings
+
+
+@task("delete_upload")
+def delete_upload(payload: dict):
+    """Removes an uploaded image from storage. Missing objects are ignored."""
+    storage.delete(payload["key"])
+
+
+def discard_unless_claimed(db: Session, key: str):
+    """
+    Schedules deletion of a direct upload in case no event form ever uses it
+    (abandoned or rejected form). ``claim_upload`` cancels it.
+    """
+    enqueue(db, "delete_upload", {"key": key}, idempotency_key=f"discard_upload:{key}",
+            delay=settings.UPLOAD_CLAIM_TIMEOUT)
+
+
+def claim_upload(db: Session, key: str):
+    """Keeps a direct upload: cancels its scheduled deletion when the caller commits."""
+    cancel(db, f"discard_upload:{key}")
@@ -0,0 +1,105 @@
+import itertools
+import os
+from typing import Any, Callable, Mapping, Optional
+
+from fastapi import Request
+from fastapi.responses import HTMLResponse, StreamingResponse
+from fastapi.templating import Jinja2Templates
+from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader
+
+
+class Deferred:
+    """
+    Proxy for a value computed on first use.
+
+    Pass query results to a streamed template as ``Deferred(query.all)`` so
+    the query runs while the page head is already on its way to the client,
+    instead of in the handler before the first byte. The value is computed
+    once; iteration, ``len()``, truth tests and attribute access go to it.
+    """
+
+    def __init__(self, fetch: Callable[[], Any]):
+        self._fetch = fetch
+        self._loaded = False
+        self._value = None
+
+    def get(self) -> Any:
+        if not self._loaded:
+            self._value = self._fetch()
+            self._loaded = True
+        return self._value
+
+    def __getattr__(self, name: str):
+        return getattr(self.get(), name)
+
+    def __iter__(self):
+        return iter(self.get())
+
+    def __len__(self):
+        return len(self.get())
+
+    def __bool__(self):
+        return bool(self.get())
+
+
+class StreamingJinja2Templates(Jinja2Templates):
+    """
+    Jinja2Templates with a persistent bytecode cache and an optional
+    streamed rendering mode.
+
+    Compiled templates are written to ``cache_dir`` so new workers load
+    bytecode instead of re-parsing every template on first use.
+    """
+
+    def __init__(self, directory: str, cache_dir: str, auto_reload: bool = False,
+                 streaming: bool = False, buffer_size: int = 5):
+        os.makedirs(cache_dir, exist_ok=True)
+        env = Environment(
+            loader=FileSystemLoader(directory),
+            autoescape=True,
+            bytecode_cache=FileSystemBytecodeCache(cache_dir),
+            auto_reload=auto_reload,
+        )
+        super().__init__(env=env)
+        self.streaming = streaming
+        self.buffer_size = buffer_size
+
+    def prewarm(self) -> int:
+        """Compiles every template up front and returns how many were loaded."""
+        names = self.env.list_templates(extensions=["html"])
+        for name in names:
+            self.env.get_template(name)
+        return len(names)
+
+    def StreamingTemplateResponse(
+        self,
+        name: str,
+        context: Mapping[str, Any],
+        status_code: int = 200,
+        headers: Optional[Mapping[str, str]] = None,
+    ) -> HTMLResponse | StreamingResponse:
+        """
+        Renders ``name`` chunk by chunk, so the page head and layout are sent
+        before the blocks further down (e.g. the event list) are rendered.
+
+        Only rendering is deferred: to also overlap database work with
+        sending the head, pass query results wrapped in ``Deferred``.
+        The first chunk is rendered before the response starts, so errors
+        early in the template still produce a proper 500. An error after that
+        can only cut the page short, which is why streaming is opt-in.
+        Falls back to a regular TemplateResponse when streaming is disabled.
+        """
+        request: Request = context["request"]
+        if not self.streaming:
+            return self.TemplateResponse(request, name, dict(context), status_code=status_code, headers=headers)
+
+        template = self.get_template(name)
+        stream = template.stream(dict(context))
+        stream.enable_buffering(self.buffer_size)
+        first_chunk = next(stream, "")
+        return StreamingResponse(
+            itertools.chain([first_chunk], stream),
+            status_code=status_code,
+            headers=headers,
+            media_type="text/html",
+        )
@@ -0,0 +1,32 @@
+import os
+import sys
+import tempfile
+
+import pytest
+from sqlalchemy.orm import sessionmaker
+
+# config.Settings() is built at import time, so point it somewhere harmless first
+_tmp = tempfile.mkdtemp(prefix="eventboard-tests-")
+os.environ.setdefault("SECRET_KEY", "test")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{_tmp}/app.db")
+os.environ.setdefault("UPLOAD_DIR", os.path.join(_tmp, "uploads"))
+os.environ.setdefault("TEMPLATE_CACHE_DIR", os.path.join(_tmp, "jinja_cache"))
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import Base, RoutingSession, make_engine  # noqa: E402
+import models  # noqa: E402,F401
+
+
+@pytest.fixture
+def db_url(tmp_path):
+    return f"sqlite:///{tmp_path}/primary.db"
+
+
+@pytest.fixture
+def session_factory(db_url):
+    """Sessions on a fresh SQLite file database with every table created."""
+    engine = make_engine(db_url)
+    Base.metadata.create_all(engine)
+    yield sessionmaker(class_=RoutingSession, autocommit=False, autoflush=False, bind=engine)
+    engine.dispose()
@@ -0,0 +1,111 @@
+import shutil
+
+import pytest
+
+import database
+import models
+from database import ReplicaPool, get_read_db, make_engine, mark_recent_write
+
+
+class FakeRequest:
+    def __init__(self):
+        self.session = {}
+
+
+def _read_db(request):
+    gen = get_read_db(request)
+    db = next(gen)
+    return db, gen
+
+
+@pytest.fixture
+def replicated(tmp_path, db_url, session_factory, monkeypatch):
+    """
+    A primary with one event copied to a read-only SQLite replica, then a
+    second event written only to the primary (i.e. replication lag).
+    """
+    db = session_factory()
+    db.add(models.Event(name="replicated"))
+    db.commit()
+    db.close()
+
+    shutil.copy(tmp_path / "primary.db", tmp_path / "replica.db")
+    replica = make_engine(f"sqlite:///file:{tmp_path}/replica.db?mode=ro&uri=true")
+
+    db = session_factory()
+    db.add(models.Event(name="primary only"))
+    db.commit()
+    db.close()
+
+    pool = ReplicaPool([replica])
+    monkeypatch.setattr(database, "SessionLocal", session_factory)
+    monkeypatch.setattr(database, "replicas", pool)
+    monkeypatch.setattr(database.settings, "REPLICA_STICKY_SECONDS", 10)
+    yield pool
+    replica.dispose()
+
+
+def _event_names(db):
+    return sorted(e.name for e in db.query(models.Event))
+
+
+def test_reads_go_to_replica(replicated):
+    db, gen = _read_db(FakeRequest())
+    assert db.info["replica"] is replicated.engines[0]
+    assert _event_names(db) == ["replicated"]
+    gen.close()
+
+
+def test_writes_from_read_session_go_to_primary(replicated, session_factory):
+    db, gen = _read_db(FakeRequest())
+    db.add(models.Event(name="written"))
+    db.commit()
+    gen.close()
+
+    primary = session_factory()
+    assert "written" in _event_names(primary)
+    primary.close()
+
+
+def test_recent_writer_reads_from_primary(replicated):
+    request = FakeRequest()
+    mark_recent_write(request)
+
+    db, gen = _read_db(request)
+    assert db.info["replica"] is None
+    assert _event_names(db) == ["primary only", "replicated"]
+    gen.close()
+
+
+def test_sticky_window_expires(replicated, monkeypatch):
+    request = FakeRequest()
+    mark_recent_write(request)
+    monkeypatch.setattr(database.settings, "REPLICA_STICKY_SECONDS", 0)
+
+    db, gen = _read_db(request)
+    assert _event_names(db) == ["replicated"]
+    gen.close()
+
+
+def test_dead_replica_falls_back_to_primary(tmp_path, session_factory, monkeypatch):
+    dead = make_engine(f"sqlite:///file:{tmp_path}/missing/replica.db?mode=ro&uri=true")
+    pool = ReplicaPool([dead])
+    pool.check_all()
+    monkeypatch.setattr(database, "SessionLocal", session_factory)
+    monkeypatch.setattr(database, "replicas", pool)
+
+    assert not pool.is_healthy(dead)
+    db, gen = _read_db(FakeRequest())
+    assert db.info["replica"] is None
+    assert db.query(models.Event).count() == 0  # served by the (empty) primary
+    gen.close()
+
+
+def test_replica_failing_mid_request_is_taken_out_of_rotation(tmp_path):
+    dead = make_engine(f"sqlite:///file:{tmp_path}/missing/replica.db?mode=ro&uri=true")
+    pool = ReplicaPool([dead])
+    assert pool.choose() is dead
+
+    with pytest.raises(Exception):
+        dead.connect()
+    assert pool.choose() is None
@@ -0,0 +1,162 @@
+from datetime import datetime
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from starlette.requests import Request
+
+import ics
+import models
+from database import get_read_db
+from routes import calendar
+
+
+def _request(**headers):
+    return Request({
+        "type": "http",
+        "method": "GET",
+        "path": "/events.ics",
+        "headers": [(k.replace("_", "-").encode(), v.encode()) for k, v in headers.items()],
+    })
+
+
+def _unfold(folded):
+    return folded.removesuffix("\r\n").replace("\r\n ", "")
+
+
+def test_escape_text():
+    assert ics.escape_text("a\\b;c,d\r\ne\nf") == "a\\\\b\\;c\\,d\\ne\\nf"
+    assert ics.escape_text("") == ""
+    assert ics.escape_text(None) == ""
+
+
+def test_short_lines_are_not_folded():
+    line = "X" * 75
+    assert ics.fold_line(line) == line + "\r\n"
+
+
+def test_long_lines_fold_at_75_octets():
+    line = "DESCRIPTION:" + "x" * 200
+    folded = ics.fold_line(line)
+
+    physical = folded.removesuffix("\r\n").split("\r\n")
+    assert len(physical) > 1
+    assert all(len(p.encode("utf-8")) <= 75 for p in physical)
+    assert all(p.startswith(" ") for p in physical[1:])
+    assert _unfold(folded) == line
+
+
+def test_folding_never_splits_multibyte_characters():
+    line = "SUMMARY:" + "é" * 40 + "🎉" * 20
+    folded = ics.fold_line(line)
+
+    for physical in folded.removesuffix("\r\n").split("\r\n"):
+        assert len(physical.encode("utf-8")) <= 75
+    assert _unfold(folded) == line
+
+
+def test_not_modified_on_matching_etag():
+    etag = '"abc"'
+    assert calendar._is_not_modified(_request(if_none_match='"abc"'), etag, None)
+    assert calendar._is_not_modified(_request(if_none_match='"x", W/"abc"'), etag, None)
+    assert calendar._is_not_modified(_request(if_none_match="*"), etag, None)
+    assert not calendar._is_not_modified(_request(if_none_match='"other"'), etag, None)
+
+
+def test_etag_takes_precedence_over_modified_since():
+    modified = datetime(2030, 1, 1, 12, 0, 0)
+    request = _request(if_none_match='"other"', if_modified_since="Tue, 01 Jan 2030 13:00:00 GMT")
+    assert not calendar._is_not_modified(request, '"abc"', modified)
+
+
+def test_not_modified_since():
+    modified = datetime(2030, 1, 1, 12, 0, 0, 500000)
+    assert calendar._is_not_modified(_request(if_modified_since="Tue, 01 Jan 2030 12:00:00 GMT"), '"a"', modified)
+    assert not calendar._is_not_modified(_request(if_modified_since="Tue, 01 Jan 2030 11:59:59 GMT"), '"a"', modified)
+    assert not calendar._is_not_modified(_request(if_modified_since="not a date"), '"a"', modified)
+    assert not calendar._is_not_modified(_request(if_modified_since="Tue, 01 Jan 2030 12:00:00 GMT"), '"a"', None)
+
+
+@pytest.fixture
+def client(session_factory):
+    app = FastAPI()
+    app.include_router(calendar.router)
+
+    def override_db():
+        db = session_factory()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app.dependency_overrides[get_read_db] = override_db
+    calendar._feed_cache.clear()
+    yield TestClient(app)
+    calendar._feed_cache.clear()
+
+
+def _add_event(session_factory, name):
+    db = session_factory()
+    event = models.Event(name=name, description="", location="", date=datetime(2030, 1, 1, 10, 0))
+    event.dates.append(models.EventDate(date=event.date))
+    db.add(event)
+    db.commit()
+    event_id = event.id
+    db.close()
+    return event_id
+
+
+def test_feed_etag_changes_on_create_edit_and_delete(client, session_factory):
+    event_id = _add_event(session_factory, "First")
+    first = client.get("/events.ics")
+    assert first.status_code == 200
+    assert "SUMMARY:First" in first.text
+    etag = first.headers["etag"]
+    assert client.get("/events.ics", headers={"If-None-Match": etag}).status_code == 304
+
+    second_id = _add_event(session_factory, "Second")
+    created = client.get("/events.ics", headers={"If-None-Match": etag})
+    assert created.status_code == 200
+    assert created.headers["etag"] != etag
+    assert "SUMMARY:Second" in created.text
+
+    db = session_factory()
+    event = db.get(models.Event, event_id)
+    event.name = "Renamed"
+    event.updated_at = datetime.utcnow()  # as edit_event does
+    db.commit()
+    db.close()
+    edited = client.get("/events.ics", headers={"If-None-Match": created.headers["etag"]})
+    assert edited.status_code == 200
+    assert edited.headers["etag"] not in (etag, created.headers["etag"])
+    assert "SUMMARY:Renamed" in edited.text
+
+    db = session_factory()
+    db.delete(db.get(models.Event, second_id))
+    db.commit()
+    db.close()
+    deleted = client.get("/events.ics", headers={"If-None-Match": edited.headers["etag"]})
+    assert deleted.status_code == 200
+    assert deleted.headers["etag"] != edited.headers["etag"]
+    assert "SUMMARY:Second" not in deleted.text
+
+
+def test_cached_feed_is_served_until_it_changes(client, session_factory):
+    _add_event(session_factory, "Cached")
+    first = client.get("/events.ics")
+    assert first.headers["etag"] in calendar._feed_cache
+    again = client.get("/events.ics")
+    assert again.content == first.content
+
+
+def test_event_feed_conditional_requests(client, session_factory):
+    event_id = _add_event(session_factory, "Single")
+    response = client.get(f"/event/{event_id}.ics")
+    assert response.status_code == 200
+    assert f"UID:event-{event_id}-0@testserver" in response.text
+    assert "DTSTART:20300101T100000\r\n" in response.text
+
+    assert client.get(f"/event/{event_id}.ics", headers={"If-None-Match": response.headers["etag"]}).status_code == 304
+    assert client.get(f"/event/{event_id}.ics",
+                      headers={"If-Modified-Since": response.headers["last-modified"]}).status_code == 304
+    assert client.get("/event/999.ics").status_code == 404
@@ -0,0 +1,219 @@
+import threading
+from datetime import datetime, timedelta
+
+from sqlalchemy import event
+
+import jobs
+import models
+from jobs import JobWorker, cancel, enqueue
+
+
+@jobs.task("test_ok")
+def _ok(payload):
+    pass
+
+
+@jobs.task("test_fail")
+def _fail(payload):
+    raise RuntimeError("boom")
+
+
+def _add(session_factory, name, **kwargs):
+    db = session_factory()
+    job = enqueue(db, name, **kwargs)
+    db.commit()
+    job_id = job.id
+    db.close()
+    return job_id
+
+
+def _get(session_factory, job_id):
+    db = session_factory()
+    job = db.get(models.Job, job_id)
+    db.close()
+    return job
+
+
+def test_only_one_worker_claims_a_job(session_factory):
+    job_id = _add(session_factory, "test_ok")
+    first, second = JobWorker(session_factory), JobWorker(session_factory)
+
+    assert first._claim() == job_id
+    assert second._claim() is None
+    job = _get(session_factory, job_id)
+    assert job.status == "running"
+    assert job.attempts == 1
+
+
+def test_concurrent_claims_are_exclusive(session_factory):
+    job_ids = {_add(session_factory, "test_ok") for _ in range(20)}
+    workers = [JobWorker(session_factory) for _ in range(4)]
+    claimed, lock = [], threading.Lock()
+
+    def claim_all(worker):
+        while (job_id := worker._claim()) is not None:
+            with lock:
+                claimed.append(job_id)
+
+    threads = [threading.Thread(target=claim_all, args=(w,)) for w in workers]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert sorted(claimed) == sorted(job_ids)
+
+
+def test_failed_job_is_retried_with_exponential_backoff(session_factory):
+    job_id = _add(session_factory, "test_fail", max_attempts=3)
+    worker = JobWorker(session_factory, retry_backoff=10)
+
+    before = datetime.utcnow()
+    assert worker.run_pending() == 1
+    job = _get(session_factory, job_id)
+    assert (job.status, job.attempts) == ("pending", 1)
+    assert before + timedelta(seconds=10) <= job.run_at <= datetime.utcnow() + timedelta(seconds=10)
+    assert job.last_error == "RuntimeError: boom"
+
+    # not due yet: nothing is claimed
+    assert worker.run_pending() == 0
+
+    db = session_factory()
+    db.get(models.Job, job_id).run_at = datetime.utcnow()
+    db.commit()
+    db.close()
+
+    before = datetime.utcnow()
+    worker.run_pending()
+    job = _get(session_factory, job_id)
+    assert (job.status, job.attempts) == ("pending", 2)
+    assert job.run_at >= before + timedelta(seconds=20)
+
+
+def test_job_fails_after_max_attempts(session_factory):
+    job_id = _add(session_factory, "test_fail", max_attempts=1)
+    JobWorker(session_factory).run_pending()
+
+    job = _get(session_factory, job_id)
+    assert (job.status, job.attempts) == ("failed", 1)
+    assert job.finished_at is not None
+
+
+def test_successful_job_is_done(session_factory):
+    job_id = _add(session_factory, "test_ok")
+    JobWorker(session_factory).run_pending()
+    assert _get(session_factory, job_id).status == "done"
+
+
+def test_enqueue_dedupes_on_idempotency_key(session_factory):
+    db = session_factory()
+    first = enqueue(db, "test_ok", idempotency_key="same")
+    assert enqueue(db, "test_ok", idempotency_key="same") is first  # same transaction
+    db.commit()
+    first_id = first.id
+    db.close()
+
+    db = session_factory()
+    assert enqueue(db, "test_ok", idempotency_key="same").id == first_id  # after commit
+    db.commit()
+    assert db.query(models.Job).count() == 1
+    db.close()
+
+
+def test_enqueued_job_is_dropped_on_rollback(session_factory):
+    db = session_factory()
+    enqueue(db, "test_ok")
+    db.rollback()
+    assert db.query(models.Job).count() == 0
+    db.close()
+
+
+def test_cancel_removes_pending_job_on_commit(session_factory):
+    job_id = _add(session_factory, "test_ok", idempotency_key="discard:a", delay=60)
+    db = session_factory()
+    assert cancel(db, "discard:a")
+    db.rollback()
+    db.close()
+    assert _get(session_factory, job_id) is not None
+
+    db = session_factory()
+    assert cancel(db, "discard:a")
+    db.commit()
+    db.close()
+    assert _get(session_factory, job_id) is None
+
+    db = session_factory()
+    enqueue(db, "test_ok", idempotency_key="discard:b")
+    assert cancel(db, "discard:b")
+    assert not cancel(db, "discard:missing")
+    db.commit()
+    assert db.query(models.Job).count() == 0
+    db.close()
+
+
+def _make_stale(session_factory, job_id, attempts):
+    db = session_factory()
+    job = db.get(models.Job, job_id)
+    job.status = "running"
+    job.attempts = attempts
+    job.locked_at = datetime.utcnow() - timedelta(hours=1)
+    db.commit()
+    db.close()
+
+
+def test_stale_job_is_reclaimed(session_factory):
+    job_id = _add(session_factory, "test_ok", max_attempts=3)
+    _make_stale(session_factory, job_id, attempts=1)
+
+    assert JobWorker(session_factory, lock_timeout=60)._claim() == job_id
+    assert _get(session_factory, job_id).attempts == 2
+
+
+def test_stale_job_on_last_attempt_is_failed(session_factory):
+    job_id = _add(session_factory, "test_ok", max_attempts=2)
+    _make_stale(session_factory, job_id, attempts=2)
+
+    worker = JobWorker(session_factory, lock_timeout=60)
+    assert worker._claim() is None
+    assert worker.sweep() == 1
+    job = _get(session_factory, job_id)
+    assert job.status == "failed"
+    assert job.attempts == 2
+
+
+def test_sweep_prunes_old_done_jobs(session_factory):
+    old_id = _add(session_factory, "test_ok")
+    recent_id = _add(session_factory, "test_ok")
+    failed_id = _add(session_factory, "test_fail")
+    db = session_factory()
+    for job_id, status, age in ((old_id, "done", 10), (recent_id, "done", 1), (failed_id, "failed", 10)):
+        job = db.get(models.Job, job_id)
+        job.status = status
+        job.finished_at = datetime.utcnow() - timedelta(days=age)
+    db.commit()
+    db.close()
+
+    assert JobWorker(session_factory, retention_days=7).sweep() == 1
+    assert _get(session_factory, old_id) is None
+    assert _get(session_factory, recent_id) is not None
+    assert _get(session_factory, failed_id) is not None
+
+
+def test_idle_claim_does_not_write(session_factory):
+    statements = []
+    engine = session_factory.kw["bind"]
+    listener = lambda conn, cursor, statement, *args: statements.append(statement.split()[0].upper())
+    event.listen(engine, "before_cursor_execute", listener)
+    try:
+        assert JobWorker(session_factory)._claim() is None
+    finally:
+        event.remove(engine, "before_cursor_execute", listener)
+    assert statements and set(statements) == {"SELECT"}
+
+
+def test_run_tolerates_missing_job(session_factory):
+    worker = JobWorker(session_factory)
+    worker._slots.acquire()
+    worker._run(12345)
+    # the slot was given back
+    assert worker._slots.acquire(blocking=False)
@@ -0,0 +1,193 @@
+import asyncio
+
+import pytest
+from starlette.applications import Starlette
+from starlette.responses import PlainTextResponse
+from starlette.routing import Route
+from starlette.testclient import TestClient
+
+from ratelimit import ConcurrencyLimit, MemoryBackend, RateLimitMiddleware, RateLimitRule, RedisBackend, min_page, parse_rate
+
+
+async def _ok(request):
+    return PlainTextResponse("ok")
+
+
+async def _boom(request):
+    raise RuntimeError("boom")
+
+
+def _client(backend, rules=(), concurrency_limits=(), **kwargs):
+    app = Starlette(routes=[
+        Route("/login", _ok, methods=["POST"]),
+        Route("/events", _ok, methods=["GET", "POST"]),
+        Route("/boom", _boom, methods=["POST"]),
+    ])
+    app.add_middleware(RateLimitMiddleware, backend=backend, rules=rules,
+                       concurrency_limits=concurrency_limits, **kwargs)
+    return TestClient(app, raise_server_exceptions=False)
+
+
+LOGIN = RateLimitRule("login", ["POST"], [r"/login"], "3/minute")
+
+
+def test_parse_rate():
+    assert parse_rate("10/minute") == (10, 10 / 60)
+    assert parse_rate("5/30") == (5, 5 / 30)
+    assert parse_rate("1/second") == (1, 1.0)
+
+
+def test_over_the_limit_gets_429_with_retry_after():
+    client = _client(MemoryBackend(), rules=[LOGIN])
+
+    assert [client.post("/login").status_code for _ in range(3)] == [200, 200, 200]
+    response = client.post("/login")
+    assert response.status_code == 429
+    assert response.headers["retry-after"] == "20"
+    # other routes are not limited
+    assert client.get("/events").status_code == 200
+
+
+def test_spoofed_forwarded_for_does_not_reset_the_limit():
+    client = _client(MemoryBackend(), rules=[LOGIN], trusted_proxies=1)
+
+    statuses = [
+        client.post("/login", headers={"X-Forwarded-For": f"10.0.0.{i}, 203.0.113.7"}).status_code
+        for i in range(5)
+    ]
+    assert statuses == [200, 200, 200, 429, 429]
+    # a different address appended by the proxy is a different client
+    assert client.post("/login", headers={"X-Forwarded-For": "203.0.113.8"}).status_code == 200
+
+
+def test_client_id():
+    middleware = RateLimitMiddleware(None, MemoryBackend(), trusted_proxies=2)
+
+    def scope(*forwarded, session=None):
+        return {
+            "headers": [(b"x-forwarded-for", value.encode()) for value in forwarded],
+            "client": ("127.0.0.1", 1234),
+            "session": session or {},
+        }
+
+    assert middleware.client_id(scope("1.1.1.1, 2.2.2.2, 3.3.3.3")) == "ip:2.2.2.2"
+    assert middleware.client_id(scope("1.1.1.1, 2.2.2.2", "3.3.3.3")) == "ip:2.2.2.2"
+    # fewer entries than proxies: the header can't be trusted
+    assert middleware.client_id(scope("1.1.1.1")) == "ip:127.0.0.1"
+    assert middleware.client_id(scope("1.1.1.1", session={"user": "bob"})) == "user:bob"
+    assert RateLimitMiddleware(None, MemoryBackend()).client_id(scope("1.1.1.1, 2.2.2.2")) == "ip:127.0.0.1"
+
+
+def test_min_page_condition():
+    rule = RateLimitRule("deep", ["GET"], [r"/events"], "1/minute", when=min_page(10))
+    client = _client(MemoryBackend(), rules=[rule])
+
+    assert [client.get("/events?page=9").status_code for _ in range(3)] == [200, 200, 200]
+    assert [client.get("/events?page=10").status_code for _ in range(2)] == [200, 429]
+    assert client.get("/events?page=abc").status_code == 200
+
+    condition = min_page(10)
+    assert not condition({"query_string": b""})
+    assert condition({"query_string": b"page=11&size=5"})
+
+
+def test_memory_backend_evicts_least_recently_used_bucket():
+    backend = MemoryBackend(max_buckets=2)
+
+    async def run():
+        await backend.take("a", 1, 0.01)
+        await backend.take("b", 1, 0.01)
+        await backend.take("a", 1, 0.01)
+        await backend.take("c", 1, 0.01)
+
+    asyncio.run(run())
+    assert list(backend._buckets) == ["a", "c"]
+
+
+def test_full_concurrency_limit_gets_503():
+    backend = MemoryBackend()
+    limit = ConcurrencyLimit("uploads", ["POST"], [r"/events"], 1)
+    client = _client(backend, concurrency_limits=[limit])
+
+    slot = asyncio.run(backend.acquire("uploads", 1))
+    response = client.post("/events")
+    assert response.status_code == 503
+    assert response.headers["retry-after"] == "1"
+    assert client.get("/events").status_code == 200
+
+    asyncio.run(backend.release("uploads", slot))
+    assert client.post("/events").status_code == 200
+
+
+def test_slot_is_released_after_an_exception():
+    backend = MemoryBackend()
+    limit = ConcurrencyLimit("boom", ["POST"], [r"/boom"], 1)
+    client = _client(backend, concurrency_limits=[limit])
+
+    assert client.post("/boom").status_code == 500
+    assert client.post("/boom").status_code == 500
+    assert backend._counters["boom"] == 0
+
+
+@pytest.fixture
+def fake_redis(monkeypatch):
+    fakeredis = pytest.importorskip("fakeredis")
+    pytest.importorskip("lupa")
+    from redis import asyncio as redis_asyncio
+
+    server = fakeredis.FakeServer()
+    monkeypatch.setattr(redis_asyncio, "from_url", lambda url: fakeredis.FakeAsyncRedis(server=server))
+    return server
+
+
+def test_redis_take_script(fake_redis):
+    async def run():
+        backend = RedisBackend("redis://fake")
+        waits = [await backend.take("login:ip:1", 2, 2 / 60) for _ in range(3)]
+        other = await backend.take("login:ip:2", 2, 2 / 60)
+        ttl = await backend.client.ttl("ratelimit:login:ip:1")
+        return waits, other, ttl
+
+    waits, other, ttl = asyncio.run(run())
+    assert waits[:2] == [0.0, 0.0]
+    assert 29 < waits[2] <= 30
+    assert other == 0.0
+    assert 0 < ttl <= 61
+
+
+def test_redis_acquire_and_release_scripts(fake_redis):
+    async def run():
+        backend = RedisBackend("redis://fake", slot_ttl=60)
+        first = await backend.acquire("uploads", 2)
+        second = await backend.acquire("uploads", 2)
+        refused = await backend.acquire("uploads", 2)
+        await backend.release("uploads", first)
+        again = await backend.acquire("uploads", 2)
+        # a slot never released (crashed worker) is dropped once it's older than slot_ttl
+        await backend.client.zadd("ratelimit:slots:leaked", {"dead": 0})
+        reclaimed = await backend.acquire("leaked", 1)
+        return first, second, refused, again, reclaimed
+
+    first, second, refused, again, reclaimed = asyncio.run(run())
+    assert first and second and first != second
+    assert refused is None
+    assert again is not None
+    assert reclaimed is not None
+
+
+def test_redis_errors_fail_open(monkeypatch):
+    from redis import asyncio as redis_asyncio
+
+    real_from_url = redis_asyncio.from_url
+    monkeypatch.setattr(redis_asyncio, "from_url", lambda url: real_from_url("redis://127.0.0.1:1/0"))
+
+    async def run():
+        backend = RedisBackend("redis://unreachable")
+        wait = await backend.take("login:ip:1", 1, 1)
+        slot = await backend.acquire("uploads", 1)
+        await backend.release("uploads", slot)
+        return wait, slot
+
+    wait, slot = asyncio.run(run())
+    assert wait == 0.0
+    assert slot is not None
@@ -0,0 +1,128 @@
+import io
+from types import SimpleNamespace
+
+import pytest
+
+from routes import backend
+from storage import LocalStorage, S3Storage
+
+
+class StubS3Client:
+    """Stands in for the boto3 S3 client; objects are kept in a dict."""
+
+    def __init__(self):
+        self.objects = {}
+
+    def upload_fileobj(self, fileobj, bucket, key, ExtraArgs=None):
+        self.objects[key] = fileobj.read()
+
+    def delete_object(self, Bucket, Key):
+        self.objects.pop(Key, None)
+
+    def head_object(self, Bucket, Key):
+        from botocore.exceptions import ClientError
+        if Key not in self.objects:
+            raise ClientError({"Error": {"Code": "404"}}, "HeadObject")
+        return {}
+
+
+@pytest.fixture
+def s3(monkeypatch):
+    boto3 = pytest.importorskip("boto3")
+    client = StubS3Client()
+    monkeypatch.setattr(boto3, "client", lambda *args, **kwargs: client)
+    return S3Storage("eventboard")
+
+
+def test_local_url_round_trip(tmp_path):
+    local = LocalStorage(str(tmp_path / "static" / "uploads"), static_dir=str(tmp_path / "static"))
+    key = local.new_key("photo.PNG", owner_id=1)
+
+    assert key.endswith(".PNG") and "/" not in key
+    url = local.url(key, "http://testserver/")
+    assert url == f"http://testserver/static/uploads/{key}"
+    assert local.key_from_url(url) == key
+    assert local.key_from_url("https://elsewhere.example/image.png") is None
+    assert local.key_from_url(None) is None
+
+
+def test_local_save_exists_delete(tmp_path):
+    local = LocalStorage(str(tmp_path / "uploads"), static_dir=str(tmp_path))
+    local.save(io.BytesIO(b"png"), "a.png")
+
+    assert local.exists("a.png")
+    assert (tmp_path / "uploads" / "a.png").read_bytes() == b"png"
+    local.delete("a.png")
+    assert not local.exists("a.png")
+    local.delete("a.png")  # missing is fine
+
+
+def test_local_upload_keys():
+    local = LocalStorage("static/uploads")
+
+    assert local.is_upload_key("0b9a.png")
+    for key in ("", ".", "..", "../config.py", "nested/a.png"):
+        assert not local.is_upload_key(key)
+    # browsers never upload to local storage, so no key is ever theirs
+    assert not local.owns("0b9a.png", 1)
+
+
+def test_s3_ownership(s3):
+    key = s3.new_key("photo.png", owner_id=1)
+
+    assert key.startswith("uploads/1/") and key.endswith(".png")
+    assert s3.owns(key, 1)
+    assert not s3.owns(key, 2)
+    assert not s3.owns("uploads/12/a.png", 1)
+    assert not s3.owns("uploads/1/../2/a.png", 1)
+    assert not s3.owns("secrets/1/a.png", 1)
+
+
+def test_s3_upload_keys(s3):
+    assert s3.is_upload_key("uploads/1/a.png")
+    assert not s3.is_upload_key("secrets/db.sql")
+    assert not s3.is_upload_key("uploads/../secrets/db.sql")
+
+
+def test_s3_url_round_trip(s3):
+    key = "uploads/1/a.png"
+    url = s3.url(key, "http://testserver/")
+    assert url == "http://testserver/media/uploads/1/a.png"
+    assert s3.key_from_url(url) == key
+    assert s3.key_from_url("http://testserver/static/uploads/a.png") is None
+    assert s3.key_from_url("") is None
+
+    s3.public_url = "https://cdn.example"
+    url = s3.url(key, "http://testserver/")
+    assert url == "https://cdn.example/uploads/1/a.png"
+    assert s3.key_from_url(url) == key
+
+
+def _store_image(monkeypatch, storage, image_key, user_id=1, image_file=None):
+    monkeypatch.setattr(backend, "storage", storage)
+    request = SimpleNamespace(base_url="http://testserver/")
+    return backend._store_image(request, SimpleNamespace(id=user_id), image_file, image_key)
+
+
+def test_store_image_accepts_own_direct_upload(monkeypatch, s3):
+    s3.client.objects["uploads/1/a.png"] = b"png"
+
+    assert _store_image(monkeypatch, s3, "uploads/1/a.png") == ("http://testserver/media/uploads/1/a.png", None)
+
+
+def test_store_image_rejects_other_users_key(monkeypatch, s3):
+    s3.client.objects["uploads/2/a.png"] = b"png"
+
+    for key in ("uploads/2/a.png", "uploads/1/../2/a.png"):
+        assert _store_image(monkeypatch, s3, key) == (None, "Error: Uploaded image not found.")
+
+
+def test_store_image_rejects_missing_upload(monkeypatch, s3):
+    assert _store_image(monkeypatch, s3, "uploads/1/never-uploaded.png") == (None, "Error: Uploaded image not found.")
+
+
+def test_store_image_rejects_keys_for_local_storage(monkeypatch, tmp_path):
+    local = LocalStorage(str(tmp_path / "uploads"), static_dir=str(tmp_path))
+    local.save(io.BytesIO(b"png"), "a.png")
+
+    assert _store_image(monkeypatch, local, "a.png") == (None, "Error: Uploaded image not found.")
@@ -0,0 +1,40 @@
+"""
+Standalone job worker.
+
+Run it next to the web app (``python worker.py``) and set
+JOB_WORKER_ENABLED=False so the web workers don't also poll the queue.
+"""
+import logging
+import signal
+
+from config import settings
+from database import SessionLocal
+from jobs import JobWorker
+import tasks  # noqa: F401  (registers task handlers)
+
+
+def build_worker() -> JobWorker:
+    """Creates a JobWorker configured from settings."""
+    return JobWorker(
+        SessionLocal,
+        concurrency=settings.JOB_CONCURRENCY,
+        poll_interval=settings.JOB_POLL_INTERVAL,
+        retry_backoff=settings.JOB_RETRY_BACKOFF,
+        lock_timeout=settings.JOB_LOCK_TIMEOUT,
+        retention_days=settings.JOB_RETENTION_DAYS,
+        sweep_interval=settings.JOB_SWEEP_INTERVAL,
+    )
+
+
+def main():
+    logging.basicConfig(level=logging.INFO)
+    worker = build_worker()
+    signal.signal(signal.SIGTERM, lambda *_: worker.stop())
+    try:
+        worker.run_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()